@@ -4,11 +4,10 @@ This file contains the ShapedAxis class, which is to be re-used in your code.
 Run the file directly to test the class out with a Zaber Device.
 """
 
-# pylint: disable=too-many-arguments
+# pylint: disable=too-many-arguments,too-many-instance-attributes
 
-import numpy as np
 from zaber_motion import Units
-from zaber_motion.ascii import Axis, Lockstep
+from zaber_motion.ascii import Axis, Lockstep, GetSetting
 from zero_vibration_shaper import ZeroVibrationShaper
 from plant import Plant
 
@@ -16,6 +15,9 @@ from plant import Plant
 class ShapedAxis:
     """A Zaber device axis that performs moves with input shaping vibration reduction theory."""
 
+    # Moves shorter than this many native position units are too small to perform and are skipped
+    MIN_MOVE_NATIVE = 1
+
     def __init__(
         self,
         zaber_axis: Axis | Lockstep,
@@ -45,25 +47,32 @@ class ShapedAxis:
 
         if isinstance(self.axis, Lockstep):
             # Get axis numbers that are used so that settings can be changed
-            self._lockstep_axes = []
-            for axis_number in self.axis.get_axis_numbers():
-                self._lockstep_axes.append(self.axis.device.get_axis(axis_number))
+            self._axis_numbers = self.axis.get_axis_numbers()
+            self._lockstep_axes = [self.axis.device.get_axis(axis_number) for axis_number in self._axis_numbers]
             self._primary_axis = self._lockstep_axes[0]
         else:
+            # Treat a single axis as a lockstep group of one so both cases share the same code
+            self._axis_numbers = [self.axis.axis_number]
+            self._lockstep_axes = [self.axis]
             self._primary_axis = self.axis
 
         self.shaper = ZeroVibrationShaper(plant)
 
         self._max_speed_limit = -1.0
 
+        # Unit conversions are linear so only the scale for each setting and unit needs to be fetched
+        self._native_scales: dict[tuple[str, Units], float] = {}
+
+        # Read the deceleration and maxspeed of every axis together in a single request
+        original_deceleration, max_speeds = self._get_axes_settings(["motion.decelonly", "maxspeed"], Units.NATIVE)
+
         # Grab the current deceleration so we can reset it back to this value later if we want.
-        if isinstance(self.axis, Lockstep):
-            self._original_deceleration = self.get_setting_from_lockstep_axes("motion.decelonly", Units.NATIVE)
-        else:
-            self._original_deceleration = [self.axis.settings.get("motion.decelonly", Units.NATIVE)]
+        self._original_deceleration = original_deceleration
+        # Keep track of the deceleration on the device so it doesn't need to be read before every move
+        self._deceleration_native = min(original_deceleration)
 
         # Set the speed limit to the device's current maxspeed so it will never be exceeded
-        self.reset_max_speed_limit()
+        self.set_max_speed_limit(min(max_speeds))
 
     def get_max_speed_limit(self, unit: Units = Units.NATIVE) -> float:
         """
@@ -72,7 +81,7 @@ class ShapedAxis:
         :param unit: The value will be returned in these units.
         :return: The velocity limit.
         """
-        return self._primary_axis.settings.convert_from_native_units("maxspeed", self._max_speed_limit, unit)
+        return self._max_speed_limit / self._get_native_scale("maxspeed", unit)
 
     def set_max_speed_limit(self, value: float, unit: Units = Units.NATIVE) -> None:
         """
@@ -81,32 +90,20 @@ class ShapedAxis:
         :param value: The velocity limit.
         :param unit: The units of the velocity limit value.
         """
-        self._max_speed_limit = self._primary_axis.settings.convert_to_native_units("maxspeed", value, unit)
+        self._max_speed_limit = value * self._get_native_scale("maxspeed", unit)
 
     def reset_max_speed_limit(self) -> None:
         """Reset the velocity limit for shaped moves to the device's existing maxspeed setting."""
-        if isinstance(self.axis, Lockstep):
-            self.set_max_speed_limit(min(self.get_setting_from_lockstep_axes("maxspeed")))
-        else:
-            self.set_max_speed_limit(self.axis.settings.get("maxspeed"))
+        self.set_max_speed_limit(min(self.get_setting_from_lockstep_axes("maxspeed")))
 
     def reset_deceleration(self) -> None:
         """Reset the trajectory deceleration to the value stored when the class was created."""
-        if isinstance(self.axis, Lockstep):
-            self.set_lockstep_axes_setting("motion.decelonly", self._original_deceleration, Units.NATIVE)
-        else:
-            self.axis.settings.set("motion.decelonly", self._original_deceleration[0], Units.NATIVE)
+        self.set_lockstep_axes_setting("motion.decelonly", self._original_deceleration, Units.NATIVE)
+        self._deceleration_native = min(self._original_deceleration)
 
     def is_homed(self) -> bool:
         """Check if all axes in lockstep group are homed."""
-        if isinstance(self.axis, Lockstep):
-            for axis in self._lockstep_axes:
-                if not axis.is_homed():
-                    return False
-        else:
-            if not self.axis.is_homed():
-                return False
-        return True
+        return all(axis.is_homed() for axis in self._lockstep_axes)
 
     def get_setting_from_lockstep_axes(self, setting: str, unit: Units = Units.NATIVE) -> list[float]:
         """
@@ -116,10 +113,7 @@ class ShapedAxis:
         :param unit: The values will be returned in these units.
         :return: A list of setting values
         """
-        values = []
-        for axis in self._lockstep_axes:
-            values.append(axis.settings.get(setting, unit))
-        return values
+        return self._get_axes_settings([setting], unit)[0]
 
     def set_lockstep_axes_setting(self, setting: str, values: list[float], unit: Units = Units.NATIVE) -> None:
         """
@@ -149,10 +143,51 @@ class ShapedAxis:
         :param unit: The positions will be returned in these units.
         :return: A list of setting values
         """
-        positions = []
-        for axis in self._lockstep_axes:
-            positions.append(axis.get_position(unit))
-        return positions
+        return self._get_axes_settings(["pos"], unit)[0]
+
+    def _get_axes_settings(self, settings: list[str], unit: Units = Units.NATIVE) -> list[list[float]]:
+        """
+        Get several settings from the axis or all axes in the lockstep group in as few requests as possible.
+
+        :param settings: The names of the settings
+        :param unit: The values will be returned in these units.
+        :return: A list of values from each axis for each of the settings
+        """
+        results = self.axis.device.settings.get_many(
+            *(GetSetting(setting, self._axis_numbers, unit) for setting in settings)
+        )
+        return [result.values for result in results]
+
+    def _get_native_scale(self, setting: str, unit: Units) -> float:
+        """
+        Get the number of native units in one of the specified units, converting only on first use.
+
+        :param setting: The name of the setting the value belongs to
+        :param unit: The units to get the scale for
+        :return: The native value of one of the specified units
+        """
+        if unit == Units.NATIVE:
+            return 1.0
+        key = (setting, unit)
+        scale = self._native_scales.get(key)
+        if scale is None:
+            scale = self._primary_axis.settings.convert_to_native_units(setting, 1, unit)
+            self._native_scales[key] = scale
+        return scale
+
+    def _convert_units(self, setting: str, value: float, from_unit: Units, to_unit: Units) -> float:
+        """
+        Convert a setting value between units using the cached native scales.
+
+        :param setting: The name of the setting the value belongs to
+        :param value: The value to convert
+        :param from_unit: The units of the value
+        :param to_unit: The units to convert the value to
+        :return: The converted value
+        """
+        if from_unit == to_unit:
+            return value
+        return value * self._get_native_scale(setting, from_unit) / self._get_native_scale(setting, to_unit)
 
     def move_relative(
         self,
@@ -171,22 +206,21 @@ class ShapedAxis:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
+        if abs(self._convert_units("pos", position, unit, Units.NATIVE)) < self.MIN_MOVE_NATIVE:
+            if wait_until_idle:
+                self.axis.wait_until_idle()
+            return
+
         # Convert all to values to the same units
-        position_native = self._primary_axis.settings.convert_to_native_units("pos", position, unit)
-        accel_native = self._primary_axis.settings.convert_to_native_units("accel", acceleration, acceleration_unit)
+        position_mm = self._convert_units("pos", position, unit, Units.LENGTH_MILLIMETRES)
+        accel_native_per_mm = self._get_native_scale("accel", Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED)
 
         if acceleration == 0:  # Get the acceleration if it wasn't specified
-            if isinstance(self.axis, Lockstep):
-                accel_native = min(self.get_setting_from_lockstep_axes("accel", Units.NATIVE))
-            else:
-                accel_native = self.axis.settings.get("accel", Units.NATIVE)
-
-        position_mm = self._primary_axis.settings.convert_from_native_units(
-            "pos", position_native, Units.LENGTH_MILLIMETRES
-        )
-        accel_mm = self._primary_axis.settings.convert_from_native_units(
-            "accel", accel_native, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-        )
+            accel_mm = min(self.get_setting_from_lockstep_axes("accel", Units.NATIVE)) / accel_native_per_mm
+        else:
+            accel_mm = self._convert_units(
+                "accel", acceleration, acceleration_unit, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
+            )
 
         # Apply the input shaping with all values of the same units
         deceleration_mm, max_speed_mm = self.shaper.shape_trapezoidal_motion(
@@ -195,19 +229,12 @@ class ShapedAxis:
             self.get_max_speed_limit(Units.VELOCITY_MILLIMETRES_PER_SECOND),
         )
 
-        # Check if the target deceleration is different from the current value
-        deceleration_native = round(
-            self._primary_axis.settings.convert_to_native_units(
-                "accel", deceleration_mm, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-            )
-        )
+        # Check if the target deceleration is different from the last value that was set
+        deceleration_native = max(1, round(deceleration_mm * accel_native_per_mm))
 
-        if isinstance(self.axis, Lockstep):
-            if min(self.get_setting_from_lockstep_axes("motion.decelonly", Units.NATIVE)) != deceleration_native:
-                self.set_lockstep_axes_setting("motion.decelonly", [max(1, deceleration_native)], Units.NATIVE)
-        else:
-            if self.axis.settings.get("motion.decelonly", Units.NATIVE) != deceleration_native:
-                self.axis.settings.set("motion.decelonly", max(1, deceleration_native), Units.NATIVE)
+        if self._deceleration_native != deceleration_native:
+            self.set_lockstep_axes_setting("motion.decelonly", [deceleration_native], Units.NATIVE)
+            self._deceleration_native = deceleration_native
 
         # Perform the move
         self.axis.move_relative(
@@ -253,15 +280,10 @@ class ShapedAxis:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        if isinstance(self.axis, Lockstep):
-            current_axis_positions = self.get_lockstep_axes_positions(Units.NATIVE)
-            end_positions = self.get_setting_from_lockstep_axes("limit.max", Units.NATIVE)
-            # Move will be positive so find min relative move
-            largest_possible_move = np.min(np.subtract(end_positions, current_axis_positions))
-        else:
-            current_position = self.axis.get_position(Units.NATIVE)
-            end_position = self.axis.settings.get("limit.max", Units.NATIVE)
-            largest_possible_move = end_position - current_position
+        # Read the positions and limits of all axes together in a single request
+        current_axis_positions, end_positions = self._get_axes_settings(["pos", "limit.max"], Units.NATIVE)
+        # Move will be positive so find min relative move
+        largest_possible_move = min(end - current for end, current in zip(end_positions, current_axis_positions))
 
         self.move_relative(largest_possible_move, Units.NATIVE, wait_until_idle, acceleration, acceleration_unit)
 
@@ -278,13 +300,8 @@ class ShapedAxis:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        if isinstance(self.axis, Lockstep):
-            current_axis_positions = self.get_lockstep_axes_positions(Units.NATIVE)
-            end_positions = self.get_setting_from_lockstep_axes("limit.min", Units.NATIVE)
-            # Move will be negative so find max relative move
-            largest_possible_move = np.max(np.subtract(end_positions, current_axis_positions))
-        else:
-            current_position = self.axis.get_position(Units.NATIVE)
-            end_position = self.axis.settings.get("limit.min", Units.NATIVE)
-            largest_possible_move = end_position - current_position
+        # Read the positions and limits of all axes together in a single request
+        current_axis_positions, end_positions = self._get_axes_settings(["pos", "limit.min"], Units.NATIVE)
+        # Move will be negative so find max relative move
+        largest_possible_move = max(end - current for end, current in zip(end_positions, current_axis_positions))
         self.move_relative(largest_possible_move, Units.NATIVE, wait_until_idle, acceleration, acceleration_unit)
@@ -4,18 +4,21 @@ This file contains the ShapedAxisStream class, which is to be re-used in your co
 Run the file directly to test the class out with a Zaber Device.
 """
 
-# pylint: disable=too-many-arguments
+# pylint: disable=too-many-arguments,too-many-instance-attributes
 
 import numpy as np
-from zaber_motion import Units, Measurement
-from zaber_motion.ascii import Axis, Lockstep, StreamAxisDefinition, StreamAxisType
-from zero_vibration_stream_generator import ZeroVibrationStreamGenerator, ShaperType
+from zaber_motion import Units
+from zaber_motion.ascii import Axis, Lockstep, GetSetting, StreamAxisDefinition, StreamAxisType, StreamMode
+from zero_vibration_stream_generator import ZeroVibrationStreamGenerator, ShaperType, StreamTrajectory
 from plant import Plant
 
 
 class ShapedAxisStream:
     """A Zaber device axis that performs streamed moves with input shaping vibration reduction."""
 
+    # Moves shorter than this many native position units are too small to perform and are skipped
+    MIN_MOVE_NATIVE = 1
+
     def __init__(
         self,
         zaber_axis: Axis | Lockstep,
@@ -49,18 +52,25 @@ class ShapedAxisStream:
 
         if isinstance(self.axis, Lockstep):
             # Get axis numbers that are used so that settings can be changed
-            self._lockstep_axes = []
-            for axis_number in self.axis.get_axis_numbers():
-                self._lockstep_axes.append(self.axis.device.get_axis(axis_number))
+            self._axis_numbers = self.axis.get_axis_numbers()
+            self._lockstep_axes = [self.axis.device.get_axis(axis_number) for axis_number in self._axis_numbers]
             self._primary_axis = self._lockstep_axes[0]
+            self._stream_axis = StreamAxisDefinition(self.axis.lockstep_group_id, StreamAxisType.LOCKSTEP)
         else:
+            # Treat a single axis as a lockstep group of one so both cases share the same code
+            self._axis_numbers = [self.axis.axis_number]
+            self._lockstep_axes = [self.axis]
             self._primary_axis = self.axis
+            self._stream_axis = StreamAxisDefinition(self.axis.axis_number, StreamAxisType.PHYSICAL)
 
         self.shaper = ZeroVibrationStreamGenerator(plant, shaper_type)
         self.stream = zaber_axis.device.streams.get_stream(stream_id)
 
         self._max_speed_limit = -1.0
 
+        # Unit conversions are linear so only the scale for each setting and unit needs to be fetched
+        self._native_scales: dict[tuple[str, Units], float] = {}
+
         # Set the speed limit to the device's current maxspeed so it will never be exceeded
         self.reset_max_speed_limit()
 
@@ -71,7 +81,7 @@ class ShapedAxisStream:
         :param unit: The value will be returned in these units.
         :return: The velocity limit.
         """
-        return self._primary_axis.settings.convert_from_native_units("maxspeed", self._max_speed_limit, unit)
+        return self._max_speed_limit / self._get_native_scale("maxspeed", unit)
 
     def set_max_speed_limit(self, value: float, unit: Units = Units.NATIVE) -> None:
         """
@@ -80,25 +90,15 @@ class ShapedAxisStream:
         :param value: The velocity limit.
         :param unit: The units of the velocity limit value.
         """
-        self._max_speed_limit = self._primary_axis.settings.convert_to_native_units("maxspeed", value, unit)
+        self._max_speed_limit = value * self._get_native_scale("maxspeed", unit)
 
     def reset_max_speed_limit(self) -> None:
         """Reset the velocity limit for shaped moves to the device's existing maxspeed setting."""
-        if isinstance(self.axis, Lockstep):
-            self.set_max_speed_limit(min(self.get_setting_from_lockstep_axes("maxspeed")))
-        else:
-            self.set_max_speed_limit(self.axis.settings.get("maxspeed"))
+        self.set_max_speed_limit(min(self.get_setting_from_lockstep_axes("maxspeed")))
 
     def is_homed(self) -> bool:
         """Check if all axes in lockstep group are homed."""
-        if isinstance(self.axis, Lockstep):
-            for axis in self._lockstep_axes:
-                if not axis.is_homed():
-                    return False
-        else:
-            if not self.axis.is_homed():
-                return False
-        return True
+        return all(axis.is_homed() for axis in self._lockstep_axes)
 
     def get_setting_from_lockstep_axes(self, setting: str, unit: Units = Units.NATIVE) -> list[float]:
         """
@@ -108,10 +108,7 @@ class ShapedAxisStream:
         :param unit: The values will be returned in these units.
         :return: A list of setting values
         """
-        values = []
-        for axis in self._lockstep_axes:
-            values.append(axis.settings.get(setting, unit))
-        return values
+        return self._get_axes_settings([setting], unit)[0]
 
     def set_lockstep_axes_setting(self, setting: str, values: list[float], unit: Units = Units.NATIVE) -> None:
         """
@@ -141,10 +138,130 @@ class ShapedAxisStream:
         :param unit: The positions will be returned in these units.
         :return: A list of setting values
         """
-        positions = []
-        for axis in self._lockstep_axes:
-            positions.append(axis.get_position(unit))
-        return positions
+        return self._get_axes_settings(["pos"], unit)[0]
+
+    def _get_axes_settings(self, settings: list[str], unit: Units = Units.NATIVE) -> list[list[float]]:
+        """
+        Get several settings from the axis or all axes in the lockstep group in as few requests as possible.
+
+        :param settings: The names of the settings
+        :param unit: The values will be returned in these units.
+        :return: A list of values from each axis for each of the settings
+        """
+        results = self.axis.device.settings.get_many(
+            *(GetSetting(setting, self._axis_numbers, unit) for setting in settings)
+        )
+        return [result.values for result in results]
+
+    def _get_native_scale(self, setting: str, unit: Units) -> float:
+        """
+        Get the number of native units in one of the specified units, converting only on first use.
+
+        :param setting: The name of the setting the value belongs to
+        :param unit: The units to get the scale for
+        :return: The native value of one of the specified units
+        """
+        if unit == Units.NATIVE:
+            return 1.0
+        key = (setting, unit)
+        scale = self._native_scales.get(key)
+        if scale is None:
+            scale = self._primary_axis.settings.convert_to_native_units(setting, 1, unit)
+            self._native_scales[key] = scale
+        return scale
+
+    def _convert_units(self, setting: str, value: float, from_unit: Units, to_unit: Units) -> float:
+        """
+        Convert a setting value between units using the cached native scales.
+
+        :param setting: The name of the setting the value belongs to
+        :param value: The value to convert
+        :param from_unit: The units of the value
+        :param to_unit: The units to convert the value to
+        :return: The converted value
+        """
+        if from_unit == to_unit:
+            return value
+        return value * self._get_native_scale(setting, from_unit) / self._get_native_scale(setting, to_unit)
+
+    def _get_native_segment_values(
+        self, stream_trajectory: StreamTrajectory, start_position: float
+    ) -> tuple[list[int], list[int], list[int]]:
+        """
+        Convert the whole shaped trajectory to native units at once.
+
+        Acceleration and max speed are kept to at least 1 native unit.
+
+        :param stream_trajectory: The shaped trajectory segments in mm units.
+        :param start_position: The position in mm that the segment positions are relative to.
+        :return: The absolute end position, acceleration and max speed of each segment in native units
+        """
+        positions = np.rint(
+            (stream_trajectory.position + start_position) * self._get_native_scale("pos", Units.LENGTH_MILLIMETRES)
+        )
+        accels = np.rint(
+            stream_trajectory.accel * self._get_native_scale("accel", Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED)
+        )
+        speed_limits = np.rint(
+            stream_trajectory.speed_limit * self._get_native_scale("maxspeed", Units.VELOCITY_MILLIMETRES_PER_SECOND)
+        )
+        return (
+            positions.astype(np.int64).tolist(),
+            np.maximum(accels, 1).astype(np.int64).tolist(),
+            np.maximum(speed_limits, 1).astype(np.int64).tolist(),
+        )
+
+    def _stream_segments(self, stream_trajectory: StreamTrajectory, start_position: float) -> None:
+        """
+        Send the shaped trajectory segments to the live stream.
+
+        :param stream_trajectory: The shaped trajectory segments in mm units.
+        :param start_position: The position in mm that the segment positions are relative to.
+        """
+        # Build the native stream commands up front so the whole trajectory is sent in one batch
+        line_positions, accels, speed_limits = self._get_native_segment_values(stream_trajectory, start_position)
+
+        # Limits are only sent when they change from the previous segment of this move
+        last_accel = None
+        last_speed_limit = None
+
+        commands = []
+        for line_position, accel, speed_limit in zip(line_positions, accels, speed_limits):
+            if accel != last_accel:
+                commands.append(f"set tanaccel {accel}")
+                last_accel = accel
+
+            if speed_limit != last_speed_limit:
+                commands.append(f"set maxspeed {speed_limit}")
+                last_speed_limit = speed_limit
+
+            # set position for the end of the segment
+            commands.append(f"line abs {line_position}")
+
+        self.stream.cork()
+        self.stream.generic_command_batch(commands)
+        self.stream.uncork()
+
+    def _skip_short_move(self, position: float, unit: Units, wait_until_idle: bool) -> bool:
+        """
+        Check if a relative move is too short to perform, waiting for motion to finish if it is.
+
+        :param position: The amount to move.
+        :param unit: The units for the position value.
+        :param wait_until_idle: If true and the move is skipped, wait until queued motion has finished.
+        :return: True if the move should be skipped.
+        """
+        if abs(self._convert_units("pos", position, unit, Units.NATIVE)) >= self.MIN_MOVE_NATIVE:
+            return False
+
+        if wait_until_idle:
+            if self.stream.mode == StreamMode.LIVE:
+                # Wait the same way as a performed move so stream errors are reported the same way
+                self.stream.wait_until_idle()
+            else:
+                # Nothing can be queued on a stream that isn't set up yet
+                self.axis.wait_until_idle()
+        return True
 
     def move_relative(
         self,
@@ -163,72 +280,65 @@ class ShapedAxisStream:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        # Convert all to values to the same units
-        position_native = self._primary_axis.settings.convert_to_native_units("pos", position, unit)
-        accel_native = self._primary_axis.settings.convert_to_native_units("accel", acceleration, acceleration_unit)
-        decel_native = accel_native
+        # Check the move size first so a skipped move doesn't need to read the position from the device
+        if self._skip_short_move(position, unit, wait_until_idle):
+            return
 
-        if acceleration == 0:  # Get the acceleration and deceleration if it wasn't specified
-            if isinstance(self.axis, Lockstep):
-                accel_native = min(self.get_setting_from_lockstep_axes("accel", Units.NATIVE))
-                decel_native = min(self.get_setting_from_lockstep_axes("motion.decelonly", Units.NATIVE))
-            else:
-                accel_native = self.axis.settings.get("accel", Units.NATIVE)
-                decel_native = self.axis.settings.get("motion.decelonly", Units.NATIVE)
+        start_position = self.axis.get_position(Units.LENGTH_MILLIMETRES)
+        self._move_relative_from(start_position, position, unit, wait_until_idle, acceleration, acceleration_unit)
 
-        position_mm = self._primary_axis.settings.convert_from_native_units(
-            "pos", position_native, Units.LENGTH_MILLIMETRES
-        )
-        accel_mm = self._primary_axis.settings.convert_from_native_units(
-            "accel", accel_native, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-        )
-        decel_mm = self._primary_axis.settings.convert_from_native_units(
-            "accel", decel_native, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-        )
+    def _move_relative_from(
+        self,
+        start_position: float,
+        position: float,
+        unit: Units,
+        wait_until_idle: bool,
+        acceleration: float,
+        acceleration_unit: Units,
+    ) -> None:
+        """
+        Input-shaped relative move starting from an already known position.
 
-        start_position = self.axis.get_position(Units.LENGTH_MILLIMETRES)
+        :param start_position: The current position in mm.
+        :param position: The amount to move.
+        :param unit: The units for the position value.
+        :param wait_until_idle: If true the command will hang until the device reaches idle state.
+        :param acceleration: The acceleration for the move.
+        :param acceleration_unit: The units for the acceleration value.
+        """
+        if self._skip_short_move(position, unit, wait_until_idle):
+            return
+
+        # Convert all to values to the same units
+        position_mm = self._convert_units("pos", position, unit, Units.LENGTH_MILLIMETRES)
+
+        if acceleration == 0:  # Get the acceleration and deceleration if it wasn't specified
+            # Acceleration and deceleration share the same linear unit conversion
+            accel_native_per_mm = self._get_native_scale("accel", Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED)
+            accel_mm, decel_mm = (
+                min(values) / accel_native_per_mm
+                for values in self._get_axes_settings(["accel", "motion.decelonly"], Units.NATIVE)
+            )
+        else:
+            accel_mm = self._convert_units(
+                "accel", acceleration, acceleration_unit, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
+            )
+            decel_mm = accel_mm
 
-        stream_segments = self.shaper.shape_trapezoidal_motion(
+        stream_trajectory = self.shaper.shape_trapezoidal_motion(
             position_mm,
             accel_mm,
             decel_mm,
             self.get_max_speed_limit(Units.VELOCITY_MILLIMETRES_PER_SECOND),
         )
 
-        self.stream.disable()
-        if isinstance(self.axis, Lockstep):
-            self.stream.setup_live_composite(StreamAxisDefinition(self.axis.lockstep_group_id, StreamAxisType.LOCKSTEP))
-        else:
-            self.stream.setup_live(self.axis.axis_number)
-        self.stream.cork()
-        for segment in stream_segments:
-            # Set acceleration making sure it is greater than zero by comparing 1 native accel unit
-            if (
-                self._primary_axis.settings.convert_to_native_units(
-                    "accel", segment.accel, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-                )
-                > 1
-            ):
-                self.stream.set_max_tangential_acceleration(
-                    segment.accel, Units.ACCELERATION_MILLIMETRES_PER_SECOND_SQUARED
-                )
-            else:
-                self.stream.set_max_tangential_acceleration(1, Units.NATIVE)
-
-            # Set max speed making sure that it is at least 1 native speed unit
-            if (
-                self._primary_axis.settings.convert_to_native_units(
-                    "maxspeed", segment.speed_limit, Units.VELOCITY_MILLIMETRES_PER_SECOND
-                )
-                > 1
-            ):
-                self.stream.set_max_speed(segment.speed_limit, Units.VELOCITY_MILLIMETRES_PER_SECOND)
-            else:
-                self.stream.set_max_speed(1, Units.NATIVE)
+        # The stream stays in live mode between moves so it only needs to be set up again if it was
+        # disabled or set up for different axes, such as by another instance sharing the stream
+        if self.stream.mode != StreamMode.LIVE or self.stream.axes != [self._stream_axis]:
+            self.stream.disable()
+            self.stream.setup_live_composite(self._stream_axis)
 
-            # set position for the end of the segment
-            self.stream.line_absolute(Measurement(segment.position + start_position, Units.LENGTH_MILLIMETRES))
-        self.stream.uncork()
+        self._stream_segments(stream_trajectory, start_position)
 
         if wait_until_idle:
             self.stream.wait_until_idle()
@@ -250,8 +360,17 @@ class ShapedAxisStream:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        current_position = self.axis.get_position(unit)
-        self.move_relative(position - current_position, unit, wait_until_idle, acceleration, acceleration_unit)
+        # Work in mm so the current position only needs to be read from the device once
+        current_position_mm = self.axis.get_position(Units.LENGTH_MILLIMETRES)
+        position_mm = self._convert_units("pos", position, unit, Units.LENGTH_MILLIMETRES)
+        self._move_relative_from(
+            current_position_mm,
+            position_mm - current_position_mm,
+            Units.LENGTH_MILLIMETRES,
+            wait_until_idle,
+            acceleration,
+            acceleration_unit,
+        )
 
     def move_max(
         self,
@@ -266,17 +385,20 @@ class ShapedAxisStream:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        if isinstance(self.axis, Lockstep):
-            current_axis_positions = self.get_lockstep_axes_positions(Units.NATIVE)
-            end_positions = self.get_setting_from_lockstep_axes("limit.max", Units.NATIVE)
-            # Move will be positive so find min relative move
-            largest_possible_move = np.min(np.subtract(end_positions, current_axis_positions))
-        else:
-            current_position = self.axis.get_position(Units.NATIVE)
-            end_position = self.axis.settings.get("limit.max", Units.NATIVE)
-            largest_possible_move = end_position - current_position
-
-        self.move_relative(largest_possible_move, Units.NATIVE, wait_until_idle, acceleration, acceleration_unit)
+        # Read the positions and limits of all axes together in a single request
+        current_axis_positions, end_positions = self._get_axes_settings(["pos", "limit.max"], Units.NATIVE)
+        # Move will be positive so find min relative move
+        largest_possible_move = min(end - current for end, current in zip(end_positions, current_axis_positions))
+
+        # The primary axis position was already read so the move doesn't need to read it again
+        self._move_relative_from(
+            current_axis_positions[0] / self._get_native_scale("pos", Units.LENGTH_MILLIMETRES),
+            largest_possible_move,
+            Units.NATIVE,
+            wait_until_idle,
+            acceleration,
+            acceleration_unit,
+        )
 
     def move_min(
         self,
@@ -291,13 +413,16 @@ class ShapedAxisStream:
         :param acceleration: The acceleration for the move.
         :param acceleration_unit: The units for the acceleration value.
         """
-        if isinstance(self.axis, Lockstep):
-            current_axis_positions = self.get_lockstep_axes_positions(Units.NATIVE)
-            end_positions = self.get_setting_from_lockstep_axes("limit.min", Units.NATIVE)
-            # Move will be negative so find max relative move
-            largest_possible_move = np.max(np.subtract(end_positions, current_axis_positions))
-        else:
-            current_position = self.axis.get_position(Units.NATIVE)
-            end_position = self.axis.settings.get("limit.min", Units.NATIVE)
-            largest_possible_move = end_position - current_position
-        self.move_relative(largest_possible_move, Units.NATIVE, wait_until_idle, acceleration, acceleration_unit)
+        # Read the positions and limits of all axes together in a single request
+        current_axis_positions, end_positions = self._get_axes_settings(["pos", "limit.min"], Units.NATIVE)
+        # Move will be negative so find max relative move
+        largest_possible_move = max(end - current for end, current in zip(end_positions, current_axis_positions))
+        # The primary axis position was already read so the move doesn't need to read it again
+        self._move_relative_from(
+            current_axis_positions[0] / self._get_native_scale("pos", Units.LENGTH_MILLIMETRES),
+            largest_possible_move,
+            Units.NATIVE,
+            wait_until_idle,
+            acceleration,
+            acceleration_unit,
+        )
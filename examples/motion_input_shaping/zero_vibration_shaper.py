@@ -8,7 +8,6 @@ Run the file directly to test the class functionality.
 # Allow short variable names
 
 import math
-import numpy as np
 from plant import Plant
 
 
@@ -80,11 +79,10 @@ class ZeroVibrationShaper:
         b = -1 * t1
         c = distance
 
-        # Special case when acceleration is equal to deceleration (no damping)
-        if a == 0:
-            return distance / t1
-
-        return float(max(np.roots([a, b, c])))
+        # Max speed is the larger root of a*v^2 + b*v + c = 0. Deceleration never exceeds acceleration
+        # so a <= 0 and the roots are real. This form of the larger root avoids cancellation error and
+        # also covers the special case when acceleration is equal to deceleration (no damping, a == 0).
+        return 2 * c / (-b + math.sqrt(b**2 - 4 * a * c))
 
     def calculate_n(self, distance: float, acceleration: float, max_speed_limit: float = -1) -> int:
         """
@@ -5,21 +5,23 @@ Run the file directly to test the class functionality.
 """
 
 import math
+from collections.abc import Iterator
 from enum import Enum
 from dataclasses import dataclass
 import numpy as np
+import numpy.typing as npt
 from plant import Plant
 
 
 class ShaperType(Enum):
-    """Enumeration for different input shaper types."""
+    """Enumeration for different input shaper types, valued by the order of the shaper."""
 
     ZV = 1
     ZVD = 2
     ZVDD = 3
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamSegment:
     """A class that contains information for a single segment of the stream trajectory."""
 
@@ -29,6 +31,44 @@ class StreamSegment:
     duration: float
 
 
+@dataclass(eq=False)
+class StreamTrajectory:
+    """A stream trajectory stored as arrays with one element per segment."""
+
+    position: npt.NDArray[np.float64]
+    speed_limit: npt.NDArray[np.float64]
+    accel: npt.NDArray[np.float64]
+    duration: npt.NDArray[np.float64]
+
+    def __len__(self) -> int:
+        """Get the number of segments."""
+        return len(self.position)
+
+    def __getitem__(self, index: int) -> StreamSegment:
+        """
+        Get a single segment of the trajectory.
+
+        :param index: Index of the segment
+        """
+        return StreamSegment(
+            float(self.position[index]),
+            float(self.speed_limit[index]),
+            float(self.accel[index]),
+            float(self.duration[index]),
+        )
+
+    def __iter__(self) -> Iterator[StreamSegment]:
+        """Iterate over the segments of the trajectory."""
+        for values in zip(
+            self.position.tolist(), self.speed_limit.tolist(), self.accel.tolist(), self.duration.tolist()
+        ):
+            yield StreamSegment(*values)
+
+    def copy(self) -> "StreamTrajectory":
+        """Get a copy of the trajectory that doesn't share any arrays with this one."""
+        return StreamTrajectory(self.position.copy(), self.speed_limit.copy(), self.accel.copy(), self.duration.copy())
+
+
 @dataclass
 class AccelPoint:
     """Acceleration points used to define trajectories."""
@@ -37,13 +77,21 @@ class AccelPoint:
     acceleration: float
 
 
+@dataclass(eq=False)
+class AccelTrajectory:
+    """Acceleration points stored as arrays of times and accelerations for use in calculations."""
+
+    time: npt.NDArray[np.float64]
+    acceleration: npt.NDArray[np.float64]
+
+
 def trapezoidal_motion_generator(
     distance: float, acceleration: float, deceleration: float, max_speed_limit: float
-) -> list[AccelPoint]:
+) -> AccelTrajectory:
     """
     Produce acceleration profile for basic trapezoidal motion.
 
-    Returns list of time and acceleration points where acceleration changes.
+    Returns the times and accelerations where acceleration changes.
     All acceleration changes are step changes for trapezoidal motion.
 
     :param distance: The trajectory distance.
@@ -51,7 +99,11 @@ def trapezoidal_motion_generator(
     :param deceleration: The trajectory deceleration.
     :param max_speed_limit: Maximum trajectory speed in the output motion.
     """
-    direction = np.sign(distance)
+    if distance == 0:
+        # There is no motion so the profile is a single point with no acceleration
+        return AccelTrajectory(np.zeros(1, dtype=np.float64), np.zeros(1, dtype=np.float64))
+
+    direction = math.copysign(1, distance)
 
     acceleration_distance = max_speed_limit**2 / (2 * acceleration)
     deceleration_distance = max_speed_limit**2 / (2 * deceleration)
@@ -63,7 +115,7 @@ def trapezoidal_motion_generator(
     else:
         # Max speed is not reached.
         max_speed_distance = 0
-        max_speed = np.sqrt(abs(distance) / (1 / (2 * acceleration) + 1 / (2 * deceleration)))
+        max_speed = math.sqrt(abs(distance) / (1 / (2 * acceleration) + 1 / (2 * deceleration)))
 
     acceleration_duration = max_speed / acceleration
     max_speed_duration = max_speed_distance / max_speed
@@ -74,25 +126,41 @@ def trapezoidal_motion_generator(
     deceleration_endtime = max_speed_endtime + deceleration_duration
 
     if max_speed_distance == 0:
-        return [
-            AccelPoint(0, acceleration * direction),
-            AccelPoint(acceleration_endtime, deceleration * (-1 * direction)),
-            AccelPoint(deceleration_endtime, 0),
-        ]
+        return AccelTrajectory(
+            np.array([0, acceleration_endtime, deceleration_endtime], dtype=np.float64),
+            np.array([acceleration * direction, deceleration * (-1 * direction), 0], dtype=np.float64),
+        )
+
+    return AccelTrajectory(
+        np.array([0, acceleration_endtime, max_speed_endtime, deceleration_endtime], dtype=np.float64),
+        np.array([acceleration * direction, 0, deceleration * (-1 * direction), 0], dtype=np.float64),
+    )
 
-    return [
-        AccelPoint(0, acceleration * direction),
-        AccelPoint(acceleration_endtime, 0),
-        AccelPoint(max_speed_endtime, deceleration * (-1 * direction)),
-        AccelPoint(deceleration_endtime, 0),
-    ]
+
+def merge_coincident_changes(
+    change_times: npt.NDArray[np.float64], accel_changes: npt.NDArray[np.float64]
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Combine acceleration changes that happen at the same time into a single change.
+
+    Without this, coincident changes from different impulses produce zero length segments.
+    Times are compared at picosecond resolution so that values which only differ by floating
+    point rounding are still treated as coincident.
+    Returns the unique change times and the summed acceleration change at each time.
+
+    :param change_times: Sorted times of acceleration changes
+    :param accel_changes: Acceleration change at each time
+    """
+    time_keys = np.rint(change_times * 1e12)
+    group_start = np.flatnonzero(np.concatenate(([True], time_keys[1:] != time_keys[:-1])))
+    return change_times[group_start], np.add.reduceat(accel_changes, group_start)
 
 
 def calculate_acceleration_convolution(
-    impulse_times: list[float],
-    impulses: list[float],
-    unshaped_trajectory: list[AccelPoint],
-) -> list[AccelPoint]:
+    impulse_times: list[float] | npt.NDArray[np.float64],
+    impulses: list[float] | npt.NDArray[np.float64],
+    unshaped_trajectory: AccelTrajectory,
+) -> AccelTrajectory:
     """
     Perform the shaping by computing convolution of acceleration with the shaper impulses.
 
@@ -104,85 +172,77 @@ def calculate_acceleration_convolution(
 
     :param impulse_times: List of shaper impulse times
     :param impulses: List of shaper impulse magnitudes
-    :param unshaped_trajectory: List of acceleration points
+    :param unshaped_trajectory: Acceleration points of the unshaped trajectory
     """
-    unshaped_time = [x.time for x in unshaped_trajectory]
-    unshaped_acceleration = [x.acceleration for x in unshaped_trajectory]
-
-    unshaped_accel_changes = np.diff(
-        np.concatenate([np.array([0]), np.array(unshaped_acceleration)])
-    )  # append a 0 to start of list of accelerations and take diff to get changes
-    num_rows = len(unshaped_acceleration)
-
-    # Create extra points based on number of impulses
-    shaped_time = np.zeros(len(unshaped_acceleration) * len(impulses))
-    accel_changes = np.zeros(len(unshaped_acceleration) * len(impulses))
-    # for each impulse create a copy of the acceleration change delayed and scaled by the
-    # impulse time and magnitude
-    for n, impulse in enumerate(impulses):
-        shaped_time[n * num_rows : (num_rows + n * num_rows)] = np.array([unshaped_time]) + impulse_times[n]
-        accel_changes[n * num_rows : (num_rows + n * num_rows)] = np.array([unshaped_accel_changes]) * impulse
-
-    # sort acceleration changes by time
-    sort_index = shaped_time.argsort()
+    unshaped_time = unshaped_trajectory.time
+    unshaped_acceleration = unshaped_trajectory.acceleration
+
+    # Acceleration changes are the diff of the accelerations with the first change being from 0
+    unshaped_accel_changes = np.diff(unshaped_acceleration, prepend=0.0)
+
+    # Each impulse adds a copy of the acceleration changes delayed and scaled by the impulse time
+    # and magnitude. The shaper only has a handful of impulses, so build all of the copies at once
+    # with an outer product (one row per impulse) instead of looping over the impulses.
+    shaped_time = np.add.outer(np.asarray(impulse_times, dtype=np.float64), unshaped_time).ravel()
+    accel_changes = np.multiply.outer(np.asarray(impulses, dtype=np.float64), unshaped_accel_changes).ravel()
+
+    # sort acceleration changes by time. Each impulse's copy is already in time order, so a stable
+    # sort (timsort) only has to merge those runs rather than sort from scratch.
+    sort_index = shaped_time.argsort(kind="stable")
     shaped_time = shaped_time[sort_index]
     accel_changes = accel_changes[sort_index]
 
+    shaped_time, accel_changes = merge_coincident_changes(shaped_time, accel_changes)
+
     # Final trajectory acceleration is cumulative sum of acceleration steps which gives the
     # superposition of the contribution from each impulse and is equivalent to the convolution
     shaped_acceleration = np.cumsum(accel_changes)  # Acceleration
 
-    shaped_trajectory = []
-    for n, accel in enumerate(shaped_acceleration):
-        shaped_trajectory.append(AccelPoint(shaped_time[n], accel))
-
-    return shaped_trajectory
+    return AccelTrajectory(shaped_time, shaped_acceleration)
 
 
-def create_stream_trajectory(trajectory: list[AccelPoint]) -> list[StreamSegment]:
+def integrate_acceleration(
+    trajectory_time: npt.NDArray[np.float64], trajectory_acceleration: npt.NDArray[np.float64]
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
     """
-    Compute information needed to execute trajectory through streams.
+    Integrate step changes in acceleration to get the end state of each trajectory segment.
 
-    Returns list of StreamSegment objects.
-    The final acceleration must be 0.
+    Returns arrays of segment end position, speed limit, acceleration magnitude, and duration.
+    The returned arrays are one element shorter than the inputs.
 
-    :param trajectory: List of acceleration points to create trajectory from
+    :param trajectory_time: Times at which the acceleration changes
+    :param trajectory_acceleration: Acceleration starting at each time
     """
-    trajectory_time = [x.time for x in trajectory]
-    trajectory_acceleration = [x.acceleration for x in trajectory]
-
-    stream_segments = []
     # trajectory is one row less than list of accelerations since first row would be the
-    # initial position (zeros)
-    previous_position = 0.0
-    previous_velocity = 0.0
-    for n in range(0, len(trajectory_acceleration) - 1):
-        # Calculate position and velocity at end of each segment using equations for constant
-        # acceleration since acceleration changes are steps.
-        current_accel = trajectory_acceleration[n]
-        dt = trajectory_time[n + 1] - trajectory_time[n]  # dt
-        current_velocity = previous_velocity + trajectory_acceleration[n] * dt  # velocity
-        current_position = previous_position + (current_velocity + previous_velocity) / 2 * dt  # position
-
-        stream_segments.append(
-            StreamSegment(
-                current_position,
-                max([abs(current_velocity), abs(previous_velocity)]),
-                abs(current_accel),
-                dt,
-            )
-        )
+    # initial position (zeros). Acceleration is constant over each segment since acceleration
+    # changes are steps, so velocity and position at the end of each segment are running sums.
+    dt = np.diff(trajectory_time)
+    segment_accel = trajectory_acceleration[:-1]
+    velocity = np.concatenate(([0.0], np.cumsum(segment_accel * dt)))
+    position = np.cumsum((velocity[1:] + velocity[:-1]) / 2 * dt)
+    speed_limit = np.maximum(np.abs(velocity[1:]), np.abs(velocity[:-1]))
+
+    return position, speed_limit, np.abs(segment_accel), dt
 
-        # Record current values and previous positions for next step
-        previous_position = current_position
-        previous_velocity = current_velocity
 
-    return stream_segments
+def create_stream_trajectory(trajectory: AccelTrajectory) -> StreamTrajectory:
+    """
+    Compute information needed to execute trajectory through streams.
+
+    Returns the stream segments as a StreamTrajectory.
+    The final acceleration must be 0.
+
+    :param trajectory: Acceleration points to create trajectory from
+    """
+    return StreamTrajectory(*integrate_acceleration(trajectory.time, trajectory.acceleration))
 
 
 class ZeroVibrationStreamGenerator:
     """A class for creating stream motion with zero vibration input shaping theory."""
 
+    # Number of recently shaped moves to keep so repeated moves don't need to be shaped again
+    TRAJECTORY_CACHE_SIZE = 32
+
     def __init__(self, plant: Plant, shaper_type: ShaperType = ShaperType.ZV) -> None:
         """
         Initialize the class.
@@ -193,6 +253,13 @@ class ZeroVibrationStreamGenerator:
         self.plant = plant
         self._shaper_type = shaper_type
 
+        # Impulses only depend on the plant and shaper type so they are cached between moves
+        self._impulses_key: tuple[float, float, ShaperType] | None = None
+        self._impulse_times = np.zeros(0)
+        self._impulse_amplitudes = np.zeros(0)
+        # Shaped trajectories for the current impulses, keyed by the move parameters
+        self._trajectory_cache: dict[tuple[float, float, float, float], StreamTrajectory] = {}
+
     @property
     def shaper_type(self) -> ShaperType:
         """Get input shaper type."""
@@ -205,49 +272,51 @@ class ZeroVibrationStreamGenerator:
 
     def get_impulse_amplitudes(self) -> list[float]:
         """Get shaper impulse magnitudes."""
-        k = math.exp(
-            (-1 * math.pi * self.plant.damping_ratio) / math.sqrt(1 - self.plant.damping_ratio**2)
-        )  # Decay factor
-
-        match self.shaper_type:
-            case ShaperType.ZV:
-                return [1 / (1 + k), k / (1 + k)]
-            case ShaperType.ZVD:
-                return [
-                    1 / (1 + 2 * k + k**2),
-                    2 * k / (1 + 2 * k + k**2),
-                    k**2 / (1 + 2 * k + k**2),
-                ]
-            case ShaperType.ZVDD:
-                return [
-                    1 / (1 + 3 * k + 3 * k**2 + k**3),
-                    3 * k / (1 + 3 * k + 3 * k**2 + k**3),
-                    3 * k**2 / (1 + 3 * k + 3 * k**2 + k**3),
-                    k**3 / (1 + 3 * k + 3 * k**2 + k**3),
-                ]
-            case _:
-                raise ValueError(f"Shaper type {self.shaper_type} is not valid.")
+        if self.plant.damping_ratio == 0:
+            k = 1.0  # An undamped plant has no decay between impulses
+        else:
+            k = math.exp(
+                (-1 * math.pi * self.plant.damping_ratio) / math.sqrt(1 - self.plant.damping_ratio**2)
+            )  # Decay factor
+
+        # The amplitudes are the terms of the binomial expansion of (1 + k)^order normalized to sum to 1
+        order = self._get_shaper_order()
+        scale = (1 / (1 + k)) ** order
+        return [math.comb(order, n) * k**n * scale for n in range(order + 1)]
 
     def get_impulse_times(self) -> list[float]:
         """Get shaper impulse times."""
-        match self.shaper_type:
-            case ShaperType.ZV:
-                return [0, self.plant.resonant_period / 2]
-            case ShaperType.ZVD:
-                return [0, self.plant.resonant_period / 2, self.plant.resonant_period]
-            case ShaperType.ZVDD:
-                return [
-                    0,
-                    self.plant.resonant_period / 2,
-                    self.plant.resonant_period,
-                    self.plant.resonant_period * 3 / 2,
-                ]
-            case _:
-                raise ValueError(f"Shaper type {self.shaper_type} is not valid.")
+        # Impulses are spaced by half of the resonant period
+        half_period = self.plant.resonant_period / 2
+        return [n * half_period for n in range(self._get_shaper_order() + 1)]
+
+    def _get_shaper_order(self) -> int:
+        """Get the order of the shaper, which is one less than the number of impulses."""
+        if not isinstance(self.shaper_type, ShaperType):
+            raise ValueError(f"Shaper type {self.shaper_type} is not valid.")
+        return self.shaper_type.value
+
+    def get_impulses(self) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """
+        Get shaper impulse times and magnitudes as arrays.
+
+        The impulses are only recomputed when the plant or shaper type has changed since the last call.
+        The returned arrays are shared with the cache and are read-only.
+        """
+        key = (self.plant.resonant_frequency, self.plant.damping_ratio, self.shaper_type)
+        if key != self._impulses_key:
+            self._impulse_times = np.array(self.get_impulse_times(), dtype=np.float64)
+            self._impulse_amplitudes = np.array(self.get_impulse_amplitudes(), dtype=np.float64)
+            # The cached arrays are returned directly, so stop callers from changing them in place
+            self._impulse_times.setflags(write=False)
+            self._impulse_amplitudes.setflags(write=False)
+            self._impulses_key = key
+            self._trajectory_cache.clear()
+        return self._impulse_times, self._impulse_amplitudes
 
     def shape_trapezoidal_motion(
         self, distance: float, acceleration: float, deceleration: float, max_speed_limit: float
-    ) -> list[StreamSegment]:
+    ) -> StreamTrajectory:
         """
         Create stream points for zero vibration trapezoidal motion.
 
@@ -259,9 +328,17 @@ class ZeroVibrationStreamGenerator:
         :param max_speed_limit: An optional limit to place on maximum trajectory speed in the
         output motion.
         """
+        if distance == 0:
+            # There is nothing to shape, so don't add timed segments that only wait for the impulses
+            return StreamTrajectory(*(np.zeros(1, dtype=np.float64) for _ in range(4)))
+
         # Get time and magnitude of the impulses used for shaping
-        impulses = self.get_impulse_amplitudes()
-        impulse_times = self.get_impulse_times()
+        impulse_times, impulses = self.get_impulses()
+
+        move_key = (distance, acceleration, deceleration, max_speed_limit)
+        cached_trajectory = self._trajectory_cache.get(move_key)
+        if cached_trajectory is not None:
+            return cached_trajectory.copy()
 
         unshaped_trajectory = trapezoidal_motion_generator(
             distance,
@@ -272,12 +349,17 @@ class ZeroVibrationStreamGenerator:
 
         shaped_trajectory = calculate_acceleration_convolution(impulse_times, impulses, unshaped_trajectory)
 
-        stream_segments = create_stream_trajectory(shaped_trajectory)
+        stream_trajectory = create_stream_trajectory(shaped_trajectory)
 
         # make sure end point position is exactly on target
-        stream_segments[-1].position = distance
+        stream_trajectory.position[-1] = distance
+
+        if len(self._trajectory_cache) >= self.TRAJECTORY_CACHE_SIZE:
+            # Drop the oldest entry, dictionaries keep insertion order
+            del self._trajectory_cache[next(iter(self._trajectory_cache))]
+        self._trajectory_cache[move_key] = stream_trajectory
 
-        return stream_segments
+        return stream_trajectory.copy()
 
 
 # Example code for using the class.
@@ -297,6 +379,6 @@ if __name__ == "__main__":
     print("")
     print(
         f"Shaped Move: "
-        f"Max Speed: {max(np.abs(point.speed_limit) for point in trajectory_points):.2f}, "
-        f"Total Time: {sum((point.duration for point in trajectory_points)):.2f}, "
+        f"Max Speed: {np.abs(trajectory_points.speed_limit).max():.2f}, "
+        f"Total Time: {trajectory_points.duration.sum():.2f}, "
     )